@@ -4,10 +4,12 @@ def discrepancy_agent(state):
     invoice = state.get("invoice")
     po = state.get("matched_po")
 
+    # Issues raised by earlier agents (e.g. DUPLICATE_INVOICE) are kept
+    earlier_issues = state.get("issues", [])
     issues = []
 
     if not invoice or not invoice.get("items") or not po:
-        state["issues"] = [{
+        state["issues"] = earlier_issues + [{
             "type": "MISSING_DATA",
             "confidence": 0.9
         }]
@@ -98,5 +100,5 @@ def discrepancy_agent(state):
             "[DiscrepancyAgent] Comparison complete. No discrepancies found."
         )
 
-    state["issues"] = issues
+    state["issues"] = earlier_issues + issues
     return state
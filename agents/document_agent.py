@@ -1,7 +1,8 @@
 import json
 import re
-from ocr_utils import extract_text
+from ocr_utils import extract_pages
 from llm import call_llm
+from prompt_builder import build_prompts, merge_invoices, MAX_OUTPUT_TOKENS
 
 def safe_json_parse(text):
     """
@@ -21,39 +22,36 @@ def safe_json_parse(text):
 
 
 def document_agent(state):
-    raw_text = extract_text(state["file_path"])
+    pages = extract_pages(state["file_path"])
+    requests = build_prompts(pages)
 
-    prompt = f"""
-You are a strict JSON generator.
+    parts = []
+    for req in requests:
+        result = call_llm(req["prompt"], max_tokens=req["max_tokens"])
+        part = safe_json_parse(result)
 
-Extract structured JSON from this invoice.
+        # Unparseable output is usually a reply cut off at max_tokens
+        if part is None and req["max_tokens"] < MAX_OUTPUT_TOKENS:
+            state["reasoning"].append(
+                f"[DocumentAgent] Output for pages {req['pages'][0]}-{req['pages'][1]} "
+                f"could not be parsed with max_tokens={req['max_tokens']}. "
+                f"Retrying with max_tokens={MAX_OUTPUT_TOKENS}."
+            )
+            result = call_llm(req["prompt"], max_tokens=MAX_OUTPUT_TOKENS)
+            part = safe_json_parse(result)
 
-Rules:
-- Output ONLY JSON
-- No explanation
-- No markdown
-- No ```json
-- No text outside JSON
+        if part is not None:
+            parts.append(part)
 
-Format:
-
-{{
-  "invoice_no": "",
-  "supplier": "",
-  "po_number": "",
-  "items": [
-    {{"description":"","quantity":0,"unit_price":0,"total":0}}
-  ],
-  "total": 0
-}}
-
-Invoice text:
-{raw_text}
-"""
-
-    result = call_llm(prompt)
-
-    invoice = safe_json_parse(result)
+    if len(requests) == 1:
+        invoice = parts[0] if parts else None
+    else:
+        invoice = merge_invoices(parts) if parts else None
+        ranges = ", ".join(f"p{r['pages'][0]}-{r['pages'][1]}" for r in requests)
+        state["reasoning"].append(
+            f"[DocumentAgent] Long invoice split into {len(requests)} page-range requests "
+            f"({ranges}); {len(parts)} parsed successfully."
+        )
 
     if invoice is None:
         # HARD FAIL SAFE — system must not crash
@@ -71,7 +69,8 @@ Invoice text:
 
     else:
         state["invoice"] = invoice
-        state["confidence_doc"] = 0.9
+        # Some page ranges failed to parse, so line items may be missing
+        state["confidence_doc"] = 0.9 if len(parts) == len(requests) else 0.5
         state["reasoning"].append(
             f"[DocumentAgent] Extracted invoice. "
             f"InvoiceNo={invoice.get('invoice_no')}, "
@@ -0,0 +1,76 @@
+import os
+from duplicate_index import get_index, file_hash
+
+def duplicate_agent(state):
+    invoice = state.get("invoice")
+    index = get_index()
+
+    state["duplicate_of"] = None
+    state["duplicate_confirmed"] = False
+
+    # Nothing reliable to compare (extraction failed) or checks disabled
+    if index is None or not invoice or not invoice.get("items"):
+        return state
+
+    file_path = state.get("file_path", "")
+    match = index.check_and_add(
+        invoice,
+        file_name=state.get("file_name") or os.path.basename(file_path),
+        content_hash=file_hash(file_path) if os.path.exists(file_path) else None,
+        run_id=state.get("run_id")
+    )
+
+    if match is None:
+        state["reasoning"].append(
+            "[DuplicateAgent] No earlier copy of this invoice found."
+        )
+        return state
+
+    # The same file retried within one run/batch is not a new submission
+    if match["match"] == "reprocessing":
+        state["reasoning"].append(
+            f"[DuplicateAgent] '{match['file_name']}' was already checked in this run "
+            f"(InvoiceNo={match['invoice_no']}). Reprocessing, not treated as a duplicate."
+        )
+        return state
+
+    # Only an exact hit with the same total is certain enough to stop here.
+    # A differing total (corrected reissue, credit note) or a near hit is
+    # flagged and still goes through matching and human review.
+    confirmed = match["match"] == "exact" and match["same_total"]
+
+    if match["match"] == "exact":
+        confidence = 0.99 if confirmed else 0.7
+        detail = (
+            f"same invoice as '{match['file_name']}' "
+            f"(InvoiceNo={match['invoice_no']}, total {'matches' if match['same_total'] else 'differs'})"
+        )
+    else:
+        confidence = 0.8 if match["same_total"] else 0.6
+        detail = (
+            f"line items nearly identical to '{match['file_name']}' "
+            f"(InvoiceNo={match['invoice_no']}, estimated similarity={match['similarity']})"
+        )
+
+    state["duplicate_of"] = match
+    state["duplicate_confirmed"] = confirmed
+    state["issues"] = [{
+        "type": "DUPLICATE_INVOICE",
+        "duplicate_of": match["invoice_no"],
+        "duplicate_file": match["file_name"],
+        "match": match["match"],
+        "confidence": confidence,
+        "severity": "CRITICAL" if confirmed else "HIGH"
+    }]
+
+    if confirmed:
+        state["decision"] = "ESCALATE_TO_HUMAN"
+        state["reasoning"].append(
+            f"[DuplicateAgent] DUPLICATE_INVOICE: {detail}. Skipping matching and escalating."
+        )
+    else:
+        state["reasoning"].append(
+            f"[DuplicateAgent] Possible DUPLICATE_INVOICE: {detail}. "
+            "Continuing with matching; human review required."
+        )
+    return state
@@ -17,7 +17,25 @@ def human_review_agent(state):
             f"[HumanReviewAgent] Human confirms escalation due to low PO match confidence ({match_conf:.2f})."
         )
 
-    # Case 2: Price mismatch is always critical
+    # Case 2: Possible duplicate must never be paid twice
+    elif any(issue["type"] == "DUPLICATE_INVOICE" for issue in issues):
+        feedback["human_decision"] = "ESCALATE_TO_HUMAN"
+        feedback["notes"] = "Possible duplicate of an earlier invoice. Confirm before payment."
+        state["decision"] = "ESCALATE_TO_HUMAN"
+        state["reasoning"].append(
+            "[HumanReviewAgent] Human reviewer confirms escalation due to possible duplicate invoice."
+        )
+
+    # Case 3: Closed PO cannot be invoiced against
+    elif any(issue["type"] == "PO_CLOSED" for issue in issues):
+        feedback["human_decision"] = "ESCALATE_TO_HUMAN"
+        feedback["notes"] = "Invoice references a closed PO. Confirm with purchasing before payment."
+        state["decision"] = "ESCALATE_TO_HUMAN"
+        state["reasoning"].append(
+            "[HumanReviewAgent] Human reviewer confirms escalation due to closed PO."
+        )
+
+    # Case 4: Price mismatch is always critical
     elif any(issue["type"] == "PRICE_MISMATCH" for issue in issues):
         feedback["human_decision"] = "ESCALATE_TO_HUMAN"
         feedback["notes"] = "Price mismatch confirmed by human reviewer."
@@ -26,7 +44,7 @@ def human_review_agent(state):
             "[HumanReviewAgent] Human reviewer confirms escalation due to price mismatch."
         )
 
-    # Case 3: Only minor issues
+    # Case 5: Only minor issues
     elif len(issues) > 0:
         feedback["human_decision"] = "REQUEST_CLARIFICATION"
         feedback["notes"] = "Minor issues found. Vendor clarification required."
@@ -35,7 +53,7 @@ def human_review_agent(state):
             "[HumanReviewAgent] Human reviewer suggests requesting clarification for minor issues."
         )
 
-    # Case 4: Everything looks good
+    # Case 6: Everything looks good
     else:
         feedback["human_decision"] = "AUTO_APPROVE"
         feedback["notes"] = "Looks good. Approved by human reviewer."
@@ -1,4 +1,5 @@
 from rapidfuzz import fuzz
+from po_store import CLOSED
 
 def matching_agent(state):
     invoice = state.get("invoice")
@@ -16,26 +17,53 @@ def matching_agent(state):
 
     # 1️⃣ Try PO number direct match
     if invoice.get("po_number"):
-        for po in po_db["purchase_orders"]:
-            if po["po_number"] == invoice["po_number"]:
-                state["matched_po"] = po
-                state["match_confidence"] = 0.99
-                state["reasoning"].append(
-                    f"[MatchingAgent] Exact PO number match found: {po['po_number']} (confidence=0.99)"
-                )
-                return state
+        by_po_number = po_db.get("by_po_number")
+        if by_po_number is None:
+            by_po_number = {po["po_number"]: po for po in po_db["purchase_orders"]}
+
+        po = by_po_number.get(invoice["po_number"])
+
+        # A closed PO must not fall through to fuzzy matching against open ones
+        if po is not None and po.get("status") == CLOSED:
+            state["matched_po"] = po
+            state["match_confidence"] = 0.99
+            state["issues"] = state.get("issues", []) + [{
+                "type": "PO_CLOSED",
+                "po_number": po["po_number"],
+                "confidence": 0.99,
+                "severity": "CRITICAL"
+            }]
+            state["reasoning"].append(
+                f"[MatchingAgent] Invoice references PO {po['po_number']}, which is CLOSED. "
+                "Flagging PO_CLOSED."
+            )
+            return state
+
+        if po is not None:
+            state["matched_po"] = po
+            state["match_confidence"] = 0.99
+            state["reasoning"].append(
+                f"[MatchingAgent] Exact PO number match found: {po['po_number']} (confidence=0.99)"
+            )
+            return state
 
     # 2️⃣ Fuzzy match on items
     best_score = 0
     best_po = None
 
+    descriptions = po_db.get("descriptions", {})
+
     for po in po_db["purchase_orders"]:
+        po_descriptions = descriptions.get(po["po_number"])
+        if po_descriptions is None:
+            po_descriptions = [item["description"] for item in po["line_items"]]
+
         score = 0
         for inv in invoice["items"]:
-            for po_item in po["line_items"]:
+            for po_description in po_descriptions:
                 score += fuzz.partial_ratio(
                     inv["description"],
-                    po_item["description"]
+                    po_description
                 )
 
         if score > best_score:
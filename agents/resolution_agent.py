@@ -38,7 +38,23 @@ def resolution_agent(state):
         )
         return state
 
-    # Rule 3: Any price mismatch is critical
+    # Rule 3: A possible duplicate, or an invoice against a closed PO,
+    # must not be paid without review
+    for issue in issues:
+        if issue["type"] == "DUPLICATE_INVOICE":
+            state["decision"] = "ESCALATE_TO_HUMAN"
+            state["reasoning"].append(
+                "[ResolutionAgent] Possible duplicate invoice (DUPLICATE_INVOICE). Escalating to human."
+            )
+            return state
+        if issue["type"] == "PO_CLOSED":
+            state["decision"] = "ESCALATE_TO_HUMAN"
+            state["reasoning"].append(
+                "[ResolutionAgent] Invoice references a closed PO (PO_CLOSED). Escalating to human."
+            )
+            return state
+
+    # Rule 4: Any price mismatch is critical
     for issue in issues:
         if issue["type"] == "PRICE_MISMATCH":
             state["decision"] = "ESCALATE_TO_HUMAN"
@@ -47,7 +63,7 @@ def resolution_agent(state):
             )
             return state
 
-    # Rule 4: No issues at all
+    # Rule 5: No issues at all
     if len(issues) == 0:
         state["decision"] = "AUTO_APPROVE"
         state["reasoning"].append(
@@ -55,7 +71,7 @@ def resolution_agent(state):
         )
         return state
 
-    # Rule 5: Only minor issues
+    # Rule 6: Only minor issues
     state["decision"] = "REQUEST_CLARIFICATION"
     state["reasoning"].append(
         f"[ResolutionAgent] Only non-critical issues detected ({[i['type'] for i in issues]}). "
@@ -5,6 +5,7 @@ import tempfile
 import hashlib
 from graph import build_graph
 from llm import call_llm
+from po_store import POStore
 from pdf2image import convert_from_path
 
 # --------------------------------------------------
@@ -23,10 +24,13 @@ st.caption(
 st.markdown("---")
 
 # --------------------------------------------------
-# Load PO DB
+# Load PO DB (kept across reruns, refreshed incrementally)
 # --------------------------------------------------
-with open("purchase_orders.json") as f:
-    po_db = json.load(f)
+@st.cache_resource
+def load_po_store():
+    return POStore.from_file("purchase_orders.json", changes_path="po_changes.jsonl")
+
+po_store = load_po_store()
 
 agent_app = build_graph()
 
@@ -65,6 +69,8 @@ def hash_state_for_llm(final_state: dict) -> str:
 def render_message(msg: str):
     if msg.startswith("[DocumentAgent]"):
         color = "#1E88E5"
+    elif msg.startswith("[DuplicateAgent]"):
+        color = "#6D4C41"
     elif msg.startswith("[MatchingAgent]"):
         color = "#F9A825"
     elif msg.startswith("[DiscrepancyAgent]"):
@@ -210,9 +216,12 @@ if uploaded_files:
                 expanded=False
             )
 
+            po_db = po_store.refresh()
             state = {
                 "file_path": tmp_path,
+                "file_name": uploaded_file.name,
                 "po_db": po_db,
+                "po_version": po_db["version"],
                 "reasoning": []
             }
 
@@ -221,6 +230,9 @@ if uploaded_files:
                 if isinstance(event, dict):
                     final_state = list(event.values())[0]
 
+            # The PO master is shared state; keep it out of caching and outputs
+            final_state.pop("po_db", None)
+
             status.update(label="Processing complete", state="complete")
 
             # ---- Cached LLM explanations ----
@@ -0,0 +1,87 @@
+import os, sys, time, random, tempfile
+from duplicate_index import DuplicateIndex
+
+# Loads N synthetic invoices into a throwaway duplicate index, then times
+# check_and_add for exact resubmissions, OCR-misread rescans and new
+# recurring invoices. Every supplier bills the same standing order each
+# month, the worst case for LSH buckets (recurring invoices share them all).
+#   python benchmark_duplicates.py [invoices] [suppliers]
+
+n_invoices = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+n_suppliers = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+samples_per_case = 2000
+
+products = [f"Product {i} grade {'ABCDEF'[i % 6]}" for i in range(5000)]
+
+
+def make_invoice(i, number=None):
+    s = i % n_suppliers
+    r = random.Random(s)
+    items = []
+    for _ in range(r.randint(2, 8)):
+        quantity, unit_price = r.randint(1, 100), r.randint(1, 500)
+        items.append({
+            "description": r.choice(products),
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "total": quantity * unit_price
+        })
+    return {
+        "invoice_no": f"INV-{s:05d}-{i if number is None else number:08d}",
+        "supplier": f"Supplier {s} Ltd",
+        "total": sum(item["total"] for item in items),
+        "items": items
+    }
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (
+        samples[len(samples) // 2] * 1000,
+        samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+    )
+
+
+index = DuplicateIndex(os.path.join(tempfile.mkdtemp(), "duplicate_index.db"))
+
+start = time.perf_counter()
+load = []
+for i in range(n_invoices):
+    invoice = make_invoice(i)
+    t = time.perf_counter()
+    index.check_and_add(invoice, file_name=f"{i}.pdf", content_hash=f"hash-{i}")
+    load.append(time.perf_counter() - t)
+    if (i + 1) % 20000 == 0:
+        p50, p99 = percentiles(load[-20000:])
+        print(f"{i + 1:>9} invoices  check_and_add p50={p50:.2f}ms  p99={p99:.2f}ms")
+load_elapsed = time.perf_counter() - start
+
+rng = random.Random(0)
+next_number = n_invoices
+cases = {
+    # Same invoice number and supplier (a resubmitted PDF)
+    "exact": lambda i: make_invoice(i),
+    # "0" misread as "O" in the invoice number
+    "rescan": lambda i: {**make_invoice(i), "invoice_no": make_invoice(i)["invoice_no"].replace("-0", "-O", 1)},
+    # Same items, next invoice number: must be a miss (and is recorded)
+    "recurring": None
+}
+
+print("\n" + "=" * 80)
+print(f"loaded {n_invoices} invoices ({n_suppliers} suppliers) in {load_elapsed:.1f}s "
+      f"({n_invoices / load_elapsed:.0f}/s)")
+for name, make in cases.items():
+    timings, matched = [], 0
+    for _ in range(samples_per_case):
+        i = rng.randrange(n_invoices)
+        if make is None:
+            invoice = make_invoice(i, number=next_number)
+            next_number += 1
+        else:
+            invoice = make(i)
+        t = time.perf_counter()
+        match = index.check_and_add(invoice, file_name=f"{name}.pdf")
+        timings.append(time.perf_counter() - t)
+        matched += match is not None
+    p50, p99 = percentiles(timings)
+    print(f"{name:10s} p50={p50:.2f}ms  p99={p99:.2f}ms  matched={matched}/{samples_per_case}")
@@ -0,0 +1,54 @@
+import os, json, re, time
+from ocr_utils import PRESETS, extract_pages
+
+# Compares OCR presets on the sample invoices, through extract_pages (the
+# confidence-filtered path the document agent uses).
+# Accuracy = share of known field values (from outputs/*.json) found in the OCR text.
+
+
+def expected_tokens(invoice):
+    tokens = [invoice.get("invoice_no"), invoice.get("po_number"), invoice.get("supplier")]
+    for item in invoice.get("items", []):
+        tokens.append(item.get("description"))
+        tokens.append(f"{float(item.get('unit_price', 0)):.2f}")
+    return [str(t) for t in tokens if t and str(t).lower() not in ["n/a", "none", "null"]]
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", text.lower().replace(",", ""))
+
+
+def score(text, tokens):
+    if not tokens:
+        return None
+    text = normalize(text)
+    return sum(1 for t in tokens if normalize(t) in text) / len(tokens)
+
+
+results = {}
+
+for file in sorted(os.listdir("invoices")):
+    if not file.endswith(".pdf"):
+        continue
+
+    expected_path = os.path.join("outputs", os.path.splitext(file)[0] + ".json")
+    tokens = []
+    if os.path.exists(expected_path):
+        with open(expected_path) as f:
+            tokens = expected_tokens(json.load(f).get("invoice") or {})
+
+    for preset in PRESETS:
+        start = time.perf_counter()
+        text = "\n".join(extract_pages(os.path.join("invoices", file), preset=preset))
+        elapsed = time.perf_counter() - start
+
+        acc = score(text, tokens)
+        results.setdefault(preset, []).append((elapsed, acc))
+        print(f"{file:40s} {preset:10s} {elapsed:6.2f}s  accuracy={'n/a' if acc is None else f'{acc:.2f}'}")
+
+print("\n" + "=" * 80)
+for preset, rows in results.items():
+    total_time = sum(r[0] for r in rows)
+    scored = [r[1] for r in rows if r[1] is not None]
+    mean_acc = sum(scored) / len(scored) if scored else 0
+    print(f"{preset:10s} total={total_time:6.2f}s  mean_accuracy={mean_acc:.2f}")
@@ -0,0 +1,66 @@
+import os, sys, time, tempfile, uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Throwaway duplicate index so earlier runs don't turn this one into duplicates
+os.environ["DUPLICATE_INDEX"] = os.path.join(tempfile.mkdtemp(), "duplicate_index.db")
+
+from graph import build_graph
+from po_store import POStore
+
+# Runs the full agent pipeline over invoices/ with N concurrent workers.
+# Use with LLM_BACKEND=replay for offline, reproducible runs:
+#   LLM_BACKEND=record python benchmark_pipeline.py 1     (once, against Groq)
+#   LLM_BACKEND=replay REPLAY_LATENCY_MS=400 python benchmark_pipeline.py 8
+
+workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+po_store = POStore.from_file("purchase_orders.json", changes_path="po_changes.jsonl")
+app = build_graph()
+
+files = [
+    os.path.join("invoices", f)
+    for f in sorted(os.listdir("invoices"))
+    if f.endswith(".pdf")
+] * repeat
+
+
+# One run id: repeated files are reprocessing, so every copy goes through
+# the full pipeline
+run_id = uuid.uuid4().hex
+
+
+def run(file_path):
+    state = {
+        "file_path": file_path,
+        "file_name": os.path.basename(file_path),
+        "run_id": run_id,
+        "po_db": po_store.refresh(),
+        "reasoning": []
+    }
+    start = time.perf_counter()
+    try:
+        final_state = app.invoke(state)
+        outcome = final_state.get("decision")
+    except Exception as e:
+        outcome = f"ERROR: {type(e).__name__}"
+    return file_path, outcome, time.perf_counter() - start
+
+
+start = time.perf_counter()
+with ThreadPoolExecutor(max_workers=workers) as pool:
+    results = list(pool.map(run, files))
+elapsed = time.perf_counter() - start
+
+for file_path, outcome, latency in results:
+    print(f"{os.path.basename(file_path):40s} {latency:6.2f}s  {outcome}")
+
+latencies = sorted(r[2] for r in results)
+errors = sum(1 for r in results if str(r[1]).startswith("ERROR"))
+print("\n" + "=" * 80)
+print(f"workers={workers} invoices={len(results)} errors={errors}")
+print(f"wall={elapsed:.2f}s  throughput={len(results) / elapsed:.2f} invoices/s")
+print(
+    f"latency p50={latencies[len(latencies) // 2]:.2f}s  "
+    f"p95={latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:.2f}s"
+)
@@ -0,0 +1,331 @@
+import os, re, json, random, hashlib, sqlite3, threading, time
+from rapidfuzz.distance import Levenshtein
+
+# Near-duplicates: MinHash signatures over the line items and total,
+# bucketed with LSH (BANDS bands of ROWS values). Only invoices sharing a
+# band bucket are compared, so lookups stay indexed as history grows.
+# Supplier boilerplate (address, bank details, terms) is deliberately left
+# out: it is shared by every invoice from that supplier.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MIN_JACCARD = 0.7
+MIN_FEATURES = 5
+# Recurring invoices with the same items share every bucket; only the most
+# recent members of a bucket are compared, keeping lookups bounded
+BUCKET_PROBE_LIMIT = 8
+
+# Near hits with different invoice numbers only count as duplicates when the
+# difference looks like an OCR misread: confusable glyphs ("1001" vs "l0O1")
+# or at most MAX_INVOICE_NO_EDITS dropped/extra characters. Digit-for-digit
+# changes are real differences (sequential numbers on recurring invoices).
+MAX_INVOICE_NO_EDITS = 1
+OCR_CONFUSABLE = str.maketrans("oilszbgq", "01152869")
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(42)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+SUPPLIER_SUFFIXES = {"ltd", "limited", "inc", "llc", "plc", "co", "corp", "gmbh", "uk"}
+
+
+def normalize_invoice_no(invoice_no):
+    # "INV-2024/1001" and "inv 2024 1001" are the same invoice
+    return re.sub(r"[^0-9a-z]", "", str(invoice_no or "").lower())
+
+
+def normalize_supplier(supplier):
+    words = re.findall(r"[0-9a-z]+", str(supplier or "").lower())
+    return " ".join(w for w in words if w not in SUPPLIER_SUFFIXES)
+
+
+def exact_key(invoice):
+    invoice_no = normalize_invoice_no(invoice.get("invoice_no"))
+    if not invoice_no:
+        return None
+    return f"{invoice_no}|{normalize_supplier(invoice.get('supplier'))}"
+
+
+def ocr_key(invoice):
+    # Same as exact_key with confusable glyphs folded, so a misread number
+    # is found by index however old the original is
+    key = exact_key(invoice)
+    if key is None:
+        return None
+    invoice_no, supplier = key.split("|", 1)
+    return f"{invoice_no.translate(OCR_CONFUSABLE)}|{supplier}"
+
+
+def _amount(value):
+    try:
+        return f"{float(value):.2f}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _features(invoice):
+    features = [f"total:{_amount(invoice.get('total'))}"]
+
+    for item in invoice.get("items") or []:
+        description = re.sub(r"[^0-9a-z]", "", str(item.get("description", "")).lower())
+        # Character shingles tolerate OCR misreads inside descriptions
+        features.extend(f"desc:{description[i:i + 4]}" for i in range(max(1, len(description) - 3)))
+        features.append(
+            f"item:{_amount(item.get('quantity'))}|{_amount(item.get('unit_price'))}"
+            f"|{_amount(item.get('total'))}"
+        )
+    return features
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _same_total(a, b):
+    try:
+        return abs(float(a or 0) - float(b or 0)) < 0.005
+    except (TypeError, ValueError):
+        return False
+
+
+def _invoice_numbers_compatible(a, b):
+    a, b = normalize_invoice_no(a), normalize_invoice_no(b)
+    if not a or not b:
+        return True
+
+    a, b = a.translate(OCR_CONFUSABLE), b.translate(OCR_CONFUSABLE)
+    ops = Levenshtein.editops(a, b)
+    if len(ops) > MAX_INVOICE_NO_EDITS:
+        return False
+    return all(
+        not (op.tag == "replace" and a[op.src_pos].isdigit() and b[op.dest_pos].isdigit())
+        for op in ops
+    )
+
+
+def _hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+
+
+def minhash(features):
+    hashes = {_hash(f) for f in features}
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS]
+
+
+def band_keys(signature, supplier=""):
+    keys = []
+    for i in range(BANDS):
+        band = signature[i * ROWS:(i + 1) * ROWS]
+        digest = hashlib.blake2b(repr((supplier, band)).encode(), digest_size=8).hexdigest()
+        keys.append(f"{i}:{digest}")
+    return keys
+
+
+def similarity(sig_a, sig_b):
+    # Share of equal MinHash values estimates the Jaccard similarity
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class DuplicateIndex:
+    """
+    Persistent (SQLite) index of every invoice seen, across batches and runs.
+
+    Lookups are bounded regardless of history size: indexed probes on the
+    content hash, exact key and OCR-folded key, then at most
+    BUCKET_PROBE_LIMIT of the most recent members of each LSH bucket. Buckets are scoped to the supplier, so
+    recurring invoices from one supplier never crowd out another's.
+
+    Check-and-insert runs in one BEGIN IMMEDIATE transaction, so separate
+    processes sharing the file (main.py, the Streamlit server) cannot both
+    miss and both record the same invoice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit mode: transactions are opened explicitly below
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS invoices (
+                id INTEGER PRIMARY KEY,
+                exact_key TEXT,
+                ocr_key TEXT,
+                invoice_no TEXT,
+                supplier TEXT,
+                total REAL,
+                file_name TEXT,
+                content_hash TEXT,
+                run_id TEXT,
+                signature TEXT,
+                created_at REAL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band_key TEXT,
+                invoice_id INTEGER
+            )
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(invoices)")]
+        for column in ("content_hash", "run_id", "ocr_key"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE invoices ADD COLUMN {column} TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_exact ON invoices(exact_key)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_content ON invoices(content_hash)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr ON invoices(ocr_key)")
+        self.conn.execute("DROP INDEX IF EXISTS idx_band")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_band_recent ON lsh_buckets(band_key, invoice_id)")
+
+    def check_and_add(self, invoice, file_name=None, content_hash=None, run_id=None):
+        """
+        Returns the matching earlier invoice as a dict, or None.
+
+        "match" is one of:
+          "reprocessing" - this file (same name and content hash) was already
+                           checked in the same run_id, e.g. a retry
+          "exact"        - same file bytes, or same invoice number and supplier
+          "near"         - similar line items (with "similarity")
+        and "same_total" tells whether the totals agree.
+
+        Only invoices with no match are recorded, so later copies are caught.
+        """
+        key = exact_key(invoice)
+        supplier = normalize_supplier(invoice.get("supplier"))
+        features = _features(invoice)
+        signature = minhash(features) if len(features) >= MIN_FEATURES else None
+
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                match = self._find(invoice, key, supplier, signature, content_hash, file_name, run_id)
+                if match is None:
+                    self._add(invoice, key, supplier, signature, file_name, content_hash, run_id)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            return match
+
+    def _find(self, invoice, key, supplier, signature, content_hash, file_name, run_id):
+        columns = "invoice_no, supplier, total, file_name"
+        total = invoice.get("total")
+
+        if content_hash:
+            row = self.conn.execute(
+                f"SELECT {columns}, run_id FROM invoices WHERE content_hash = ? "
+                f"ORDER BY (file_name IS ? AND run_id IS ?) DESC LIMIT 1",
+                (content_hash, file_name, run_id)
+            ).fetchone()
+            if row:
+                same_run = run_id is not None and row[4] == run_id and row[3] == file_name
+                return {
+                    **self._row(row),
+                    "match": "reprocessing" if same_run else "exact",
+                    "same_total": True
+                }
+
+        if key:
+            row = self.conn.execute(
+                f"SELECT {columns} FROM invoices WHERE exact_key = ? LIMIT 1", (key,)
+            ).fetchone()
+            if row:
+                return {**self._row(row), "match": "exact", "same_total": _same_total(row[2], total)}
+
+        if signature is None:
+            return None
+
+        # Most recent members of each bucket, via the (band_key, invoice_id)
+        # index, plus any invoice whose number differs only by OCR misreads
+        keys = band_keys(signature, supplier)
+        candidates = [
+            "SELECT invoice_id FROM (SELECT invoice_id FROM lsh_buckets WHERE band_key = ? "
+            "ORDER BY invoice_id DESC LIMIT ?)"
+            for _ in keys
+        ]
+        params = [v for k in keys for v in (k, BUCKET_PROBE_LIMIT)]
+        loose_key = ocr_key(invoice)
+        if loose_key:
+            candidates.append(
+                "SELECT id FROM (SELECT id FROM invoices WHERE ocr_key = ? ORDER BY id DESC LIMIT ?)"
+            )
+            params += [loose_key, BUCKET_PROBE_LIMIT]
+        rows = self.conn.execute(
+            f"SELECT {columns}, signature FROM invoices WHERE id IN ({' UNION '.join(candidates)})",
+            params
+        ).fetchall()
+
+        best, best_sim = None, MIN_JACCARD
+        for row in rows:
+            # Recurring invoices (same items, new number) are not duplicates
+            if not _invoice_numbers_compatible(row[0], invoice.get("invoice_no")):
+                continue
+            sim = similarity(signature, json.loads(row[4]))
+            if sim >= best_sim:
+                best, best_sim = row, sim
+
+        if best is None:
+            return None
+        return {
+            **self._row(best),
+            "match": "near",
+            "similarity": round(best_sim, 2),
+            "same_total": _same_total(best[2], total)
+        }
+
+    def _add(self, invoice, key, supplier, signature, file_name, content_hash, run_id):
+        cur = self.conn.execute(
+            "INSERT INTO invoices (exact_key, ocr_key, invoice_no, supplier, total, file_name, "
+            "content_hash, run_id, signature, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                ocr_key(invoice),
+                invoice.get("invoice_no"),
+                invoice.get("supplier"),
+                invoice.get("total"),
+                file_name,
+                content_hash,
+                run_id,
+                json.dumps(signature) if signature is not None else None,
+                time.time(),
+            )
+        )
+        if signature is not None:
+            self.conn.executemany(
+                "INSERT INTO lsh_buckets (band_key, invoice_id) VALUES (?, ?)",
+                [(band_key, cur.lastrowid) for band_key in band_keys(signature, supplier)]
+            )
+
+    @staticmethod
+    def _row(row):
+        return {
+            "invoice_no": row[0],
+            "supplier": row[1],
+            "total": row[2],
+            "file_name": row[3],
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Shared index at DUPLICATE_INDEX (default duplicate_index.db).
+    Set DUPLICATE_INDEX to an empty string to disable duplicate checks.
+    """
+    global _index
+    path = os.environ.get("DUPLICATE_INDEX", "duplicate_index.db")
+    if not path:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DuplicateIndex(path)
+    return _index
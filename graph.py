@@ -1,6 +1,7 @@
 from langgraph.graph import StateGraph
 
 from agents.document_agent import document_agent
+from agents.duplicate_agent import duplicate_agent
 from agents.matching_agent import matching_agent
 from agents.discrepancy_agent import discrepancy_agent
 from agents.resolution_agent import resolution_agent
@@ -10,6 +11,7 @@ def build_graph():
     graph = StateGraph(dict)
 
     graph.add_node("document", document_agent)
+    graph.add_node("duplicate", duplicate_agent)
     graph.add_node("matching", matching_agent)
     graph.add_node("discrepancy", discrepancy_agent)
     graph.add_node("resolution", resolution_agent)
@@ -17,7 +19,23 @@ def build_graph():
 
     graph.set_entry_point("document")
 
-    graph.add_edge("document", "matching")
+    graph.add_edge("document", "duplicate")
+
+    # Confirmed duplicates are short-circuited before matching
+    def is_duplicate(state):
+        if state.get("duplicate_confirmed"):
+            return "__end__"
+        return "matching"
+
+    graph.add_conditional_edges(
+        "duplicate",
+        is_duplicate,
+        {
+            "matching": "matching",
+            "__end__": "__end__"
+        }
+    )
+
     graph.add_edge("matching", "discrepancy")
     graph.add_edge("discrepancy", "resolution")
 
@@ -25,7 +43,7 @@ def build_graph():
     def need_human_review(state):
         if state.get("match_confidence", 0) < 0.6:
             return "human_review"
-        if any(issue["type"] == "PRICE_MISMATCH" for issue in state.get("issues", [])):
+        if any(issue["type"] in ["PRICE_MISMATCH", "DUPLICATE_INVOICE", "PO_CLOSED"] for issue in state.get("issues", [])):
             return "human_review"
         return "__end__"
 
@@ -1,19 +1,187 @@
-from groq import Groq
+import os, json, time, hashlib, random, threading
+import urllib.request
 
 
-GROQ_API_KEY = "YOUR_GROQ_API"
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "YOUR_GROQ_API")
+MODEL = os.environ.get("LLM_MODEL", "llama-3.1-8b-instant")
+SYSTEM_PROMPT = "You are a precise JSON extraction engine. Always output valid JSON only."
+TEMPERATURE = 0.1
 
-client = Groq(api_key=GROQ_API_KEY)
 
-def call_llm(prompt):
-    resp = client.chat.completions.create(
-       
-        model="llama-3.1-8b-instant",
-        messages=[
-            {"role": "system", "content": "You are a precise JSON extraction engine. Always output valid JSON only."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.1,
-        max_tokens=2048,
+class GroqBackend:
+    def __init__(self, api_key=GROQ_API_KEY, model=MODEL):
+        from groq import Groq
+
+        self.client = Groq(api_key=api_key)
+        self.model = model
+
+    def complete(self, prompt, max_tokens):
+        resp = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=TEMPERATURE,
+            max_tokens=max_tokens,
+        )
+        return resp.choices[0].message.content
+
+
+class OpenAICompatibleBackend:
+    """
+    Local server speaking the OpenAI chat completions API
+    (llama.cpp server, vLLM, Ollama, LM Studio, ...).
+    """
+
+    def __init__(self, base_url=None, model=MODEL, api_key=None, timeout=120):
+        self.base_url = (base_url or os.environ.get("LLM_BASE_URL", "http://localhost:8000/v1")).rstrip("/")
+        self.model = model
+        self.api_key = api_key or os.environ.get("LLM_API_KEY", "not-needed")
+        self.timeout = timeout
+
+    def complete(self, prompt, max_tokens):
+        body = json.dumps({
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": TEMPERATURE,
+            "max_tokens": max_tokens,
+        }).encode()
+        req = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.api_key}"
+            }
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            data = json.load(resp)
+        return data["choices"][0]["message"]["content"]
+
+
+def request_key(prompt, max_tokens):
+    payload = json.dumps(
+        [MODEL, SYSTEM_PROMPT, TEMPERATURE, max_tokens, prompt]
     )
-    return resp.choices[0].message.content
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_recordings(path):
+    recordings = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    recordings[rec["key"]] = rec["response"]
+    return recordings
+
+
+class RecordingBackend:
+    """
+    Proxies another backend and appends every prompt -> response pair to a
+    JSON lines store for later replay.
+    """
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, max_tokens):
+        response = self.inner.complete(prompt, max_tokens)
+        record = {
+            "key": request_key(prompt, max_tokens),
+            "max_tokens": max_tokens,
+            "prompt": prompt,
+            "response": response
+        }
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        return response
+
+
+class ReplayBackend:
+    """
+    Serves recorded responses with simulated latency and failures.
+
+    Latency jitter and injected errors are derived from the seed, the request
+    key and how many times that key was requested, so runs are reproducible
+    regardless of thread scheduling.
+    """
+
+    def __init__(self, path, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=0):
+        self.recordings = load_recordings(path)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, max_tokens):
+        key = request_key(prompt, max_tokens)
+
+        with self._lock:
+            n = self._calls.get(key, 0)
+            self._calls[key] = n + 1
+        rng = random.Random(f"{self.seed}:{key}:{n}")
+
+        delay_ms = self.latency_ms + rng.uniform(0, self.jitter_ms)
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+        if rng.random() < self.error_rate:
+            raise RuntimeError(f"Simulated LLM error (key={key[:12]}, call={n})")
+
+        if key not in self.recordings:
+            raise KeyError(f"No recorded LLM response for prompt (key={key[:12]})")
+        return self.recordings[key]
+
+
+def build_backend(name=None):
+    """
+    Picks the backend from LLM_BACKEND: groq (default), local, record, replay.
+    """
+    name = name or os.environ.get("LLM_BACKEND", "groq")
+    store = os.environ.get("LLM_STORE", "llm_recordings.jsonl")
+
+    if name == "groq":
+        return GroqBackend()
+    if name == "local":
+        return OpenAICompatibleBackend()
+    if name == "record":
+        inner = build_backend(os.environ.get("LLM_RECORD_FROM", "groq"))
+        return RecordingBackend(inner, store)
+    if name == "replay":
+        return ReplayBackend(
+            store,
+            latency_ms=float(os.environ.get("REPLAY_LATENCY_MS", 0)),
+            jitter_ms=float(os.environ.get("REPLAY_JITTER_MS", 0)),
+            error_rate=float(os.environ.get("REPLAY_ERROR_RATE", 0)),
+            seed=int(os.environ.get("REPLAY_SEED", 0))
+        )
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+
+def call_llm(prompt, max_tokens=2048):
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_backend()
+    return _backend.complete(prompt, max_tokens)
@@ -1,22 +1,34 @@
-import os, json
+import os, json, uuid
 from graph import build_graph
+from po_store import POStore
 
-with open("purchase_orders.json") as f:
-    po_db = json.load(f)
+po_store = POStore.from_file("purchase_orders.json", changes_path="po_changes.jsonl")
 
 app = build_graph()
 
+# Identifies this batch: retrying a file within it is not a duplicate,
+# but the same file in a later run is
+run_id = uuid.uuid4().hex
+
 for file in os.listdir("invoices"):
     if not file.endswith(".pdf"):
         continue
 
+    # Pick up PO inserts/amendments/closures published since the last invoice
+    po_db = po_store.refresh()
+
     state = {
         "file_path": os.path.join("invoices", file),
+        "file_name": file,
+        "run_id": run_id,
         "po_db": po_db,
+        "po_version": po_db["version"],
         "reasoning": []
     }
 
     final_state = app.invoke(state)
+    # The PO master is shared state; only its version belongs in the output
+    final_state.pop("po_db", None)
 
     print("\n" + "="*80)
     print("📄", file)
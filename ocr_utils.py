@@ -1,11 +1,204 @@
+import os
 import pytesseract, cv2, numpy as np
 from pdf2image import convert_from_path
 
-def extract_text(file_path):
-    text = ""
-    pages = convert_from_path(file_path, dpi=300)
-    for page in pages:
-        img = cv2.cvtColor(np.array(page), cv2.COLOR_RGB2BGR)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        text += pytesseract.image_to_string(gray)
-    return text
+# Characters that appear on invoice tables (ids, amounts, dates, currencies)
+INVOICE_WHITELIST = (
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+    "0123456789.,:;-/#%&()@£$€+*"
+)
+
+# Preprocessing presets. "baseline" reproduces the original behaviour:
+# fixed 300 dpi, plain grayscale and default Tesseract settings.
+PRESETS = {
+    "baseline": {
+        "dpi": 300,
+        "adaptive_dpi": False,
+        "crop": False,
+        "deskew": False,
+        "binarize": False,
+        "psm": None,
+        "oem": None,
+        "whitelist": None,
+    },
+    "balanced": {
+        "dpi": 300,
+        "adaptive_dpi": True,
+        "crop": True,
+        "deskew": True,
+        "binarize": True,
+        "psm": 6,
+        "oem": 1,
+        "whitelist": None,
+    },
+    "fast": {
+        "dpi": 200,
+        "adaptive_dpi": True,
+        "crop": True,
+        "deskew": False,
+        "binarize": True,
+        "psm": 6,
+        "oem": 1,
+        "whitelist": INVOICE_WHITELIST,
+    },
+}
+
+DEFAULT_PRESET = os.environ.get("OCR_PRESET", "baseline")
+
+# Adaptive DPI: render a cheap probe, then pick the dpi that brings the median
+# glyph height close to what Tesseract reads best.
+PROBE_DPI = 72
+TARGET_GLYPH_HEIGHT = 24
+MIN_DPI = 150
+
+
+def _median_glyph_height(gray):
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+
+    # Skip the background label and drop specks / ruling lines
+    heights = [
+        stats[i, cv2.CC_STAT_HEIGHT]
+        for i in range(1, count)
+        if 2 <= stats[i, cv2.CC_STAT_HEIGHT] <= gray.shape[0] // 10
+        and stats[i, cv2.CC_STAT_WIDTH] <= gray.shape[1] // 10
+    ]
+    if not heights:
+        return None
+    return float(np.median(heights))
+
+
+def choose_dpi(file_path, cfg):
+    if not cfg["adaptive_dpi"]:
+        return cfg["dpi"]
+
+    probe = convert_from_path(file_path, dpi=PROBE_DPI, first_page=1, last_page=1)
+    if not probe:
+        return cfg["dpi"]
+
+    gray = cv2.cvtColor(np.array(probe[0]), cv2.COLOR_RGB2GRAY)
+    glyph_height = _median_glyph_height(gray)
+    if not glyph_height:
+        return cfg["dpi"]
+
+    dpi = int(PROBE_DPI * TARGET_GLYPH_HEIGHT / glyph_height)
+    # The preset dpi is the ceiling; clean large-print pages render smaller
+    return max(MIN_DPI, min(cfg["dpi"], dpi))
+
+
+def crop_to_content(gray, margin=10):
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    coords = cv2.findNonZero(binary)
+    if coords is None:
+        return gray
+
+    x, y, w, h = cv2.boundingRect(coords)
+    x0, y0 = max(0, x - margin), max(0, y - margin)
+    x1, y1 = min(gray.shape[1], x + w + margin), min(gray.shape[0], y + h + margin)
+    return gray[y0:y1, x0:x1]
+
+
+def deskew(gray, max_angle=10):
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    coords = cv2.findNonZero(binary)
+    if coords is None:
+        return gray
+
+    angle = cv2.minAreaRect(coords)[-1]
+    # minAreaRect reports angles in [0, 90) (OpenCV >= 4.5) or [-90, 0)
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+
+    # Leave near-straight pages alone, and don't trust large angles
+    if abs(angle) < 0.3 or abs(angle) > max_angle:
+        return gray
+
+    h, w = gray.shape
+    matrix = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    return cv2.warpAffine(
+        gray, matrix, (w, h),
+        flags=cv2.INTER_CUBIC,
+        borderMode=cv2.BORDER_REPLICATE
+    )
+
+
+def binarize(gray):
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def preprocess(page, cfg):
+    img = cv2.cvtColor(np.array(page), cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    if cfg["deskew"]:
+        gray = deskew(gray)
+    if cfg["crop"]:
+        gray = crop_to_content(gray)
+    if cfg["binarize"]:
+        gray = binarize(gray)
+    return gray
+
+
+def tesseract_config(cfg):
+    parts = []
+    if cfg["psm"] is not None:
+        parts.append(f"--psm {cfg['psm']}")
+    if cfg["oem"] is not None:
+        parts.append(f"--oem {cfg['oem']}")
+    if cfg["whitelist"]:
+        parts.append(f"-c tessedit_char_whitelist={cfg['whitelist']}")
+    return " ".join(parts)
+
+
+def _prepared_pages(file_path, preset):
+    """
+    Renders the PDF at the preset's dpi and yields (preprocessed image,
+    tesseract config) per page.
+    """
+    cfg = PRESETS[preset or DEFAULT_PRESET]
+    config = tesseract_config(cfg)
+
+    for page in convert_from_path(file_path, dpi=choose_dpi(file_path, cfg)):
+        yield preprocess(page, cfg), config
+
+
+def extract_text(file_path, preset=None):
+    return "".join(
+        pytesseract.image_to_string(image, config=config)
+        for image, config in _prepared_pages(file_path, preset)
+    )
+
+
+def _confident_text(data, min_conf):
+    """
+    Rebuilds page text from image_to_data output, keeping only words Tesseract
+    is reasonably sure about. Layout rows (conf -1) only mark line structure.
+    """
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        if not word or float(data["conf"][i]) < min_conf:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+    return "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+
+
+def extract_pages(file_path, preset=None, min_conf=30):
+    """
+    Like extract_text, but returns one string per page with low-confidence
+    words (OCR noise) dropped.
+    """
+    texts = []
+    for image, config in _prepared_pages(file_path, preset):
+        data = pytesseract.image_to_data(
+            image,
+            config=config,
+            output_type=pytesseract.Output.DICT
+        )
+        texts.append(_confident_text(data, min_conf))
+    return texts
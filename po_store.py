@@ -0,0 +1,209 @@
+import os, json, logging, threading
+
+logger = logging.getLogger(__name__)
+
+
+CLOSED = "CLOSED"
+
+
+def is_open(po):
+    return po.get("status") != CLOSED
+
+
+def _build_snapshot(pos_by_number, version):
+    """
+    Builds an immutable view of the PO master.
+
+    The returned dict keeps the same "purchase_orders" shape as
+    purchase_orders.json so agents can keep treating it as the PO db.
+    "purchase_orders" and "descriptions" only hold open POs (fuzzy match
+    candidates); "by_po_number" also keeps closed POs, marked with
+    status CLOSED, so invoices quoting them can be flagged.
+    """
+    return {
+        "version": version,
+        "purchase_orders": [po for po in pos_by_number.values() if is_open(po)],
+        "by_po_number": pos_by_number,
+        "descriptions": {
+            po_number: [
+                item.get("description", "")
+                for item in po.get("line_items", [])
+            ]
+            for po_number, po in pos_by_number.items()
+            if is_open(po)
+        },
+    }
+
+
+def _is_valid_change(change):
+    if not isinstance(change, dict):
+        return False
+
+    op = change.get("op")
+    if op == "insert":
+        po = change.get("po")
+        return (
+            isinstance(po, dict)
+            and bool(po.get("po_number"))
+            and isinstance(po.get("line_items", []), list)
+            and all(isinstance(item, dict) for item in po.get("line_items", []))
+        )
+    if op == "amend":
+        fields = change.get("fields", {})
+        line_items = fields.get("line_items", []) if isinstance(fields, dict) else None
+        return (
+            bool(change.get("po_number"))
+            and isinstance(fields, dict)
+            # Renumbering would leave the entry keyed under its old number
+            and fields.get("po_number", change.get("po_number")) == change.get("po_number")
+            and isinstance(line_items, list)
+            and all(isinstance(item, dict) for item in line_items)
+        )
+    if op == "close":
+        return bool(change.get("po_number"))
+    return False
+
+
+class POStore:
+    """
+    Versioned PO master with incremental updates.
+
+    Each applied batch of changes produces a new snapshot. Snapshots are never
+    mutated, so an invoice that started against version N finishes against it
+    even if newer versions are published meanwhile.
+    """
+
+    def __init__(self, po_db, changes_path=None):
+        self.changes_path = changes_path
+        self._offset = 0
+        self._inode = None
+        self._lock = threading.Lock()
+
+        pos_by_number = {po["po_number"]: po for po in po_db["purchase_orders"]}
+        self._snapshot = _build_snapshot(pos_by_number, 0)
+
+    @classmethod
+    def from_file(cls, path, changes_path=None):
+        with open(path) as f:
+            po_db = json.load(f)
+        return cls(po_db, changes_path=changes_path)
+
+    def snapshot(self):
+        return self._snapshot
+
+    def apply_changes(self, changes):
+        """
+        Applies a batch of change records and publishes a new snapshot.
+
+        Supported records:
+          {"op": "insert", "po": {...}}
+          {"op": "amend",  "po_number": "...", "fields": {...}}
+          {"op": "close",  "po_number": "..."}
+
+        Invalid records are logged and skipped.
+        """
+        valid = [c for c in changes if _is_valid_change(c)]
+        for change in changes:
+            if not _is_valid_change(change):
+                logger.warning("Skipping invalid PO change record: %s", str(change)[:200])
+        changes = valid
+        with self._lock:
+            return self._apply(changes)
+
+    def _apply(self, changes):
+        # Caller holds self._lock
+        if not changes:
+            return self._snapshot
+
+        current = self._snapshot
+        pos_by_number = dict(current["by_po_number"])
+        descriptions = dict(current["descriptions"])
+
+        for change in changes:
+            op = change.get("op")
+
+            if op == "insert":
+                po = change["po"]
+                po_number = po["po_number"]
+            elif op == "amend":
+                po_number = change["po_number"]
+                if po_number not in pos_by_number:
+                    continue
+                po = {**pos_by_number[po_number], **change.get("fields", {})}
+            elif op == "close":
+                po_number = change["po_number"]
+                if po_number not in pos_by_number:
+                    continue
+                po = {**pos_by_number[po_number], "status": CLOSED}
+            else:
+                continue
+
+            pos_by_number[po_number] = po
+            if is_open(po):
+                descriptions[po_number] = [
+                    item.get("description", "")
+                    for item in po.get("line_items", [])
+                ]
+            else:
+                descriptions.pop(po_number, None)
+
+        # Only the PO list is rebuilt; indexes were updated per change above
+        self._snapshot = {
+            "version": current["version"] + 1,
+            "purchase_orders": [po for po in pos_by_number.values() if is_open(po)],
+            "by_po_number": pos_by_number,
+            "descriptions": descriptions,
+        }
+        return self._snapshot
+
+    def refresh(self):
+        """
+        Reads change records appended to the change file (JSON lines) since the
+        last refresh and applies them as one batch.
+
+        Reading, applying and advancing the file offset happen under one lock,
+        so concurrent sessions never apply the same range twice or out of
+        order. Malformed lines and invalid records are logged and skipped.
+
+        The change file may be rotated: rename it away and start a new one (or
+        truncate it) once its records have been applied. A new inode or a
+        file shorter than the saved offset restarts reading from the top.
+        """
+        if not self.changes_path or not os.path.exists(self.changes_path):
+            return self._snapshot
+
+        with self._lock:
+            changes = []
+            with open(self.changes_path) as f:
+                st = os.fstat(f.fileno())
+                if st.st_ino != self._inode or st.st_size < self._offset:
+                    if self._inode is not None:
+                        logger.info("PO change file %s was rotated; reading from the start", self.changes_path)
+                    self._inode = st.st_ino
+                    self._offset = 0
+
+                offset = self._offset
+                f.seek(offset)
+                while True:
+                    line = f.readline()
+                    # Leave a partially written trailing line for the next refresh
+                    if not line or not line.endswith("\n"):
+                        break
+                    offset = f.tell()
+                    if not line.strip():
+                        continue
+
+                    try:
+                        change = json.loads(line)
+                    except ValueError as e:
+                        logger.warning("Skipping malformed PO change line: %s (%s)", line.strip()[:200], e)
+                        continue
+                    if not _is_valid_change(change):
+                        logger.warning("Skipping invalid PO change record: %s", line.strip()[:200])
+                        continue
+                    changes.append(change)
+
+            snapshot = self._apply(changes)
+            # Only move past the batch once it has been published
+            self._offset = offset
+            return snapshot
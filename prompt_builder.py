@@ -0,0 +1,202 @@
+import math
+import re
+from collections import Counter
+
+# Budgets are in approximate tokens (see count_tokens)
+PROMPT_TOKEN_BUDGET = 3000
+MIN_OUTPUT_TOKENS = 512
+MAX_OUTPUT_TOKENS = 2048
+OUTPUT_TOKENS_PER_ITEM = 40
+OUTPUT_TOKENS_HEADER = 120
+OUTPUT_SAFETY_FACTOR = 1.5
+
+# Lines this close to the top/bottom of a page are header/footer candidates
+EDGE_LINES = 5
+
+EXTRACTION_PROMPT = """
+You are a strict JSON generator.
+
+Extract structured JSON from this invoice.
+
+Rules:
+- Output ONLY JSON
+- No explanation
+- No markdown
+- No ```json
+- No text outside JSON
+
+Format:
+
+{{
+  "invoice_no": "",
+  "supplier": "",
+  "po_number": "",
+  "items": [
+    {{"description":"","quantity":0,"unit_price":0,"total":0}}
+  ],
+  "total": 0
+}}
+{part_note}
+Invoice text:
+{text}
+"""
+
+
+def count_tokens(text):
+    """
+    Cheap token estimate (~4 characters per token for Llama-style BPE on
+    English/numeric text). Good enough for budgeting; no tokenizer needed.
+    """
+    return math.ceil(len(text) / 4)
+
+
+def _is_noise(line):
+    # Only lines made entirely of symbols (table rules, specks). Short lines
+    # such as a lone quantity "5" from column-wise OCR are real data;
+    # low-confidence words were already dropped by ocr_utils.extract_pages
+    return not any(ch.isalnum() for ch in line)
+
+
+def normalize_page(text):
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r"\s+", " ", line).strip()
+        if line and not _is_noise(line):
+            lines.append(line)
+    return lines
+
+
+def drop_repeated_edges(pages):
+    """
+    Removes header/footer lines repeated across pages, keeping the first
+    occurrence (page 1 usually holds the invoice number and supplier).
+    """
+    if len(pages) < 2:
+        return pages
+
+    seen_on = Counter()
+    for lines in pages:
+        edges = set(lines[:EDGE_LINES] + lines[-EDGE_LINES:])
+        seen_on.update(edges)
+
+    repeated = {line for line, n in seen_on.items() if n >= 2}
+
+    cleaned = [pages[0]]
+    for lines in pages[1:]:
+        edge_idx = set(range(min(EDGE_LINES, len(lines)))) | set(
+            range(max(0, len(lines) - EDGE_LINES), len(lines))
+        )
+        cleaned.append([
+            line for i, line in enumerate(lines)
+            if not (i in edge_idx and line in repeated)
+        ])
+    return cleaned
+
+
+def _line_stats(line):
+    """
+    Returns (is_item_line, amounts) for one line. Row-wise OCR: item lines
+    carry at least two numbers (qty, price, ...). Column-wise OCR splits
+    qty/price/total into separate blocks, so amounts are counted too: each
+    item row carries at least a unit price and a total.
+    """
+    is_item_line = len(re.findall(r"\d+(?:[.,]\d+)?", line)) >= 2
+    amounts = len(re.findall(r"\d[.,]\d{2}\b", line))
+    return is_item_line, amounts
+
+
+def _output_tokens(item_lines, amounts):
+    rows = max(item_lines, amounts // 2)
+    return int((OUTPUT_TOKENS_HEADER + rows * OUTPUT_TOKENS_PER_ITEM) * OUTPUT_SAFETY_FACTOR)
+
+
+def estimate_output_tokens(text):
+    stats = [_line_stats(line) for line in text.splitlines()]
+    estimate = _output_tokens(sum(1 for is_item, _ in stats if is_item), sum(n for _, n in stats))
+    return max(MIN_OUTPUT_TOKENS, min(MAX_OUTPUT_TOKENS, estimate))
+
+
+def _chunk_pages(pages, budget):
+    """
+    Greedily groups consecutive pages into chunks that fit the prompt budget
+    and whose expected output fits MAX_OUTPUT_TOKENS. A page that is too
+    large on its own is split by lines.
+    """
+    chunks = []
+    current, current_tokens, item_lines, amounts = [], 0, 0, 0
+    first_page = last_page = 1
+
+    for page_no, lines in enumerate(pages, start=1):
+        for line in lines:
+            line_tokens = count_tokens(line) + 1
+            is_item, line_amounts = _line_stats(line)
+            too_long = current_tokens + line_tokens > budget
+            too_much_output = _output_tokens(item_lines + is_item, amounts + line_amounts) > MAX_OUTPUT_TOKENS
+            if current and (too_long or too_much_output):
+                chunks.append((first_page, last_page, current))
+                current, current_tokens, item_lines, amounts = [], 0, 0, 0
+            if not current:
+                first_page = page_no
+            current.append(line)
+            current_tokens += line_tokens
+            item_lines += is_item
+            amounts += line_amounts
+            last_page = page_no
+
+    if current:
+        chunks.append((first_page, last_page, current))
+    return chunks
+
+
+def build_prompts(pages, budget=PROMPT_TOKEN_BUDGET):
+    """
+    Turns raw OCR pages into one or more extraction requests.
+
+    Returns a list of dicts with the prompt, its page range, the estimated
+    prompt size and the max_tokens to request.
+    """
+    cleaned = drop_repeated_edges([normalize_page(p) for p in pages])
+    template_tokens = count_tokens(EXTRACTION_PROMPT)
+    # A blank scan still gets one request so the agent's fallback path runs
+    chunks = _chunk_pages(cleaned, max(1, budget - template_tokens)) or [(1, 1, [])]
+
+    requests = []
+    for first_page, last_page, lines in chunks:
+        text = "\n".join(lines)
+        part_note = ""
+        if len(chunks) > 1:
+            part_note = (
+                f"\nThis is pages {first_page}-{last_page} of a longer invoice. "
+                "Extract only what is shown here; leave fields that do not appear empty.\n"
+            )
+        prompt = EXTRACTION_PROMPT.format(part_note=part_note, text=text)
+        requests.append({
+            "pages": (first_page, last_page),
+            "prompt": prompt,
+            "prompt_tokens": count_tokens(prompt),
+            "max_tokens": estimate_output_tokens(text),
+        })
+    return requests
+
+
+def merge_invoices(parts):
+    """
+    Merges per-chunk extractions: header fields come from the first chunk that
+    has them, line items are concatenated in page order.
+    """
+    merged = {
+        "invoice_no": None,
+        "supplier": None,
+        "po_number": None,
+        "items": [],
+        "total": 0
+    }
+    for part in parts:
+        for field in ("invoice_no", "supplier", "po_number"):
+            if not merged[field] and part.get(field):
+                merged[field] = part[field]
+        merged["items"].extend(part.get("items") or [])
+        # The grand total is printed on the last page
+        if part.get("total"):
+            merged["total"] = part["total"]
+    return merged